@@ -4,23 +4,44 @@ Shared clean-ups and schema normalisation.
 
 from __future__ import annotations
 import re, unicodedata
+from functools import lru_cache
 from typing import List, Dict, Any
 
+from schema_resume import Education, Job, Resume
+
 _CAMEL = re.compile(r"(?<=[a-z])(?=[A-Z])")
 _DIGITS = re.compile(r"[^\d]")
+_NON_DIGITS = str.maketrans("", "", "".join(chr(c) for c in range(128) if not chr(c).isdigit()))
+# every delimiter smart_split honours (comma + all of str.isspace, max U+3000) → ","
+_DELIM = str.maketrans({chr(c): "," for c in range(0x3001) if chr(c).isspace()})
+_SENTENCE_SPLIT = re.compile(r"[•\u2022\-–]\s*|\.\s+")
+_SKILL_HDR = re.compile(r"skill", re.I).search
 
 
 # ───────────────────────────────────────── helpers ──
+@lru_cache(maxsize=4096)  # titles, companies and skill tokens repeat a lot
 def decamel(s: str) -> str:
-    return _CAMEL.sub(" ", s or "").strip()
+    if not s:
+        return ""
+    # single-case tokens ("python", "SQL") can't hold a lower→upper seam
+    if s.islower() or s.isupper():
+        return s.strip()
+    return _CAMEL.sub(" ", s).strip()
+
+
+def _nfkc(text: str) -> str:
+    # ASCII is already NFKC – skip the normaliser for the common résumé case
+    return text if text.isascii() else unicodedata.normalize("NFKC", text)
 
 
 def smart_split(text: str) -> List[str]:
-    return re.split(r"[,\s]+", unicodedata.normalize("NFKC", text).strip())
+    return [t for t in _nfkc(text).translate(_DELIM).split(",") if t]
 
 
 def normalise_phone(raw: str) -> str:
-    digits = _DIGITS.sub("", raw or "")
+    text = raw or ""
+    # translate() only knows ASCII; PDF dashes/narrow spaces go through the regex
+    digits = text.translate(_NON_DIGITS) if text.isascii() else _DIGITS.sub("", text)
     if digits.startswith("48") and len(digits) >= 11:
         return "+48 " + " ".join([digits[2:5], digits[5:8], digits[8:11]])
     if len(digits) == 9:
@@ -30,23 +51,70 @@ def normalise_phone(raw: str) -> str:
 
 def expand_username_url(token: str, domain: str) -> str:
     token = token.strip()
-    if token.startswith("http"):
+    if not token or token.startswith("http"):
         return token
-    return f"https://{domain}/{token.lstrip('@').split('/')[-1]}" if token else ""
+    user = token.lstrip("@")
+    return f"https://{domain}/{user[user.rfind('/') + 1:]}"
 
 
 def _sentences(raw: str | list[str]) -> List[str]:  # Allow list of strings as input
     """Turn long description into bullet sentences."""
     if isinstance(raw, list):
         raw = " ".join(raw)  # Join list elements into a single string
-    bits = re.split(
-        r"[•\u2022\-–]\s*|\.\s+", (raw or "").strip()
+    bits = _SENTENCE_SPLIT.split(
+        (raw or "").strip()
     )  # Ensure raw is not None before stripping
     return [decamel(x) for x in bits if x]
 
 
+# alternative spellings the LLM uses → canonical key
+_EXP_ALIAS = {"position": "title", "startDate": "start", "endDate": "end"}
+_EDU_ALIAS = {"fieldOfStudy": "field", "startDate": "start", "endDate": "end"}
+
+# keys consumed by the normalisers; anything else the LLM emits is carried over
+_JOB_KEYS = {"title", "company", "location", "start", "end", "description", *_EXP_ALIAS}
+_EDU_KEYS = {"degree", "field", "school", "location", "start", "end", "description", *_EDU_ALIAS}
+
+
+def _canon(d: Dict[str, Any], alias: Dict[str, str]) -> Dict[str, Any]:
+    for src, dst in alias.items():
+        if src in d and not d.get(dst):
+            d[dst] = d.pop(src)
+    return d
+
+
+def _norm_job(j: Dict[str, Any]) -> Job:
+    j = _canon(j, _EXP_ALIAS)
+    out = {k: v for k, v in j.items() if k not in _JOB_KEYS}
+    out["title"] = decamel(j.get("title", ""))
+    out["company"] = decamel(j.get("company", ""))
+    out["location"] = decamel(j.get("location", ""))
+    out["start"] = j.get("start", "")
+    out["end"] = j.get("end", "")
+    if (description := j.get("description")) and not j.get("bullets"):
+        out["bullets"] = _sentences(description)
+    return out
+
+
+def _norm_edu(e: Dict[str, Any]) -> Education:
+    e = _canon(e, _EDU_ALIAS)
+    out = {k: v for k, v in e.items() if k not in _EDU_KEYS}
+    deg, field = e.get("degree") or "", e.get("field") or ""
+    out["degree"] = decamel(" ".join([deg, field]).strip())
+    out["school"] = decamel(e.get("school", ""))
+    out["location"] = decamel(e.get("location", ""))
+    out["start"] = e.get("start", "")
+    out["end"] = e.get("end", "")
+    if "description" in e:
+        if e.get("bullets"):
+            out["description"] = e["description"]  # bullets win; the text is kept alongside
+        else:
+            out["bullets"] = _sentences(e["description"])
+    return out
+
+
 # ───────────────────────────────────────── cleaner ──
-def clean_resume(r: Dict[str, Any]) -> Dict[str, Any]:
+def clean_resume(r: Dict[str, Any]) -> Resume:
     # headline
     r["headline"] = decamel(r.get("headline", ""))
 
@@ -54,38 +122,25 @@ def clean_resume(r: Dict[str, Any]) -> Dict[str, Any]:
     if ph := r.get("contact", {}).get("phone"):
         r["contact"]["phone"] = normalise_phone(ph)
 
-    # experience
-    for j in r.get("experience", []):
-        j["title"] = decamel(j.pop("title", j.pop("position", "")))
-        j["company"] = decamel(j.get("company", ""))
-        j["location"] = decamel(j.get("location", ""))
-        j["start"] = j.pop("start", j.pop("startDate", ""))
-        j["end"] = j.pop("end", j.pop("endDate", ""))
-        description = j.pop("description", None)  # Pop description
-        if description and not j.get("bullets"):
-            j["bullets"] = _sentences(description)  # Pass it to _sentences
-
-    # education
-    for e in r.get("education", []):
-        deg = e.pop("degree", "")
-        field = e.pop("fieldOfStudy", "")
-        e["degree"] = decamel(" ".join([deg, field]).strip())
-        e["school"] = decamel(e.get("school", ""))
-        e["location"] = decamel(e.get("location", ""))
-        e["start"] = e.pop("start", e.pop("startDate", ""))
-        e["end"] = e.pop("end", e.pop("endDate", ""))
-        if "description" in e and not e.get("bullets"):
-            e["bullets"] = _sentences(e.pop("description"))
-
-    # projects → guarantee dict shape
+    # experience / education – one fresh dict per entry, empties dropped on the way
+    r["experience"] = [
+        job for j in r.get("experience", []) if (job := _norm_job(j))["title"]
+    ]
+    r["education"] = [
+        edu for e in r.get("education", []) if (edu := _norm_edu(e))["degree"]
+    ]
+
+    # projects → guarantee dict shape, untitled ones dropped
     fixed = []
+    add = fixed.append
     for p in r.get("projects", []):
         if isinstance(p, str):
-            fixed.append({"title": decamel(p), "url": "", "bullets": []})
-        else:
-            fixed.append(
+            if title := decamel(p):
+                add({"title": title, "url": "", "bullets": []})
+        elif title := decamel(p.get("title") or p.get("name", "")):
+            add(
                 {
-                    "title": decamel(p.get("title") or p.get("name", "")),
+                    "title": title,
                     "url": p.get("url", p.get("link", "")),
                     "bullets": (
                         p.get("bullets") or _sentences(p.get("description", ""))
@@ -94,14 +149,10 @@ def clean_resume(r: Dict[str, Any]) -> Dict[str, Any]:
             )
     r["projects"] = fixed
 
-    # skills – drop headers & long junk tokens
+    # skills – drop headers & long junk tokens (cheap length test first)
+    dc = decamel
     for cat, lst in list(r.get("skills", {}).items()):
         r["skills"][cat] = [
-            decamel(x) for x in lst if x and len(x) < 30 and "skill" not in x.lower()
+            dc(x) for x in lst if x and len(x) < 30 and not _SKILL_HDR(x)
         ]
-
-    # purge empties
-    r["experience"] = [j for j in r["experience"] if j.get("title")]
-    r["education"] = [e for e in r["education"] if e.get("degree")]
-    r["projects"] = [p for p in r["projects"] if p.get("title")]
     return r
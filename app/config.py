@@ -5,10 +5,22 @@ This file contains configuration for different LLM providers and models.
 You can easily switch between providers by changing the settings here.
 """
 
-from dotenv import load_dotenv
-load_dotenv()          # ← must be before os.getenv(...)
 import os
 
+
+def init_env() -> None:
+    """Load a .env file into os.environ (skipped if python-dotenv is missing)."""
+    if os.environ.get("RESUME2SITE_SKIP_DOTENV") == "1":
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+init_env()  # ← must be before os.getenv(...)
+
 # LLM Provider Configuration
 # Set to "ollama" or "openai"
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")  # Changed default to OpenAI
@@ -22,16 +34,27 @@ DEFAULT_MODEL = {
 }
 
 # OpenAI Configuration
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable.")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # checked lazily – Ollama users don't need it
 OPENAI_MODEL_PARAMS = {
     "temperature": 0.7,
     "max_tokens": 4096
 }
 
 # Ollama Configuration  
-OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", os.getenv("OLLAMA_HOST", "http://localhost:11434"))
+# Keep the model (and its prompt cache) loaded between the plan/HTML/fix calls
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_MODEL_PARAMS = {
+    "num_ctx": 16384  # system prompt + résumé + plan + a full HTML page
+}
+
+def require_openai_key() -> str:
+    """Return the OpenAI API key, raising if it is not configured."""
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable.")
+    return key
+
 
 def get_model_for_provider(provider: str = None) -> str:
     """Get the default model for the specified provider."""
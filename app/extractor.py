@@ -1,21 +1,111 @@
 """
 PDF ➜ raw text
+– pypdfium2 backend by default (plain text, no layout analysis)
+– PDF_BACKEND=pdfplumber falls back to pdfplumber for odd font encodings
+– PDF_BACKEND=pdfminer reads the content stream once via pdfminer.high_level
 – strips `(cid:N)` glyph artifacts
-– suppresses verbose CropBox warnings from pdfplumber/pdfminer
 """
 
 from pathlib import Path
-import re, logging, warnings, pdfplumber
-
-# silence noisy PDF logging
-logging.getLogger("pdfplumber").setLevel(logging.ERROR)
-logging.getLogger("pdfminer").setLevel(logging.ERROR)
-warnings.filterwarnings("ignore", category=UserWarning, module="pdfminer")
+import os, re, logging, warnings
 
 _CID_RE = re.compile(r"\(cid:\d+\)")
+_PARALLEL_MIN_PAGES = 8  # résumés are 1–3 pages; worker start-up only pays off on long docs
+_logs_quieted = False
 
 
 def pdf_to_text(pdf_path: str | Path) -> str:
+    backend = os.getenv("PDF_BACKEND", "pdfium").lower()
+    if backend == "pdfplumber":
+        pages = _pdfplumber_pages(pdf_path)
+    elif backend == "pdfminer":
+        pages = _pdfminer_pages(pdf_path)
+    else:
+        pages = _pdfium_pages(pdf_path)
+    return "\n".join(pages)  # pages arrive CID-stripped from the backend
+
+
+def _pdfium_pages(pdf_path: str | Path) -> list[str]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    n = len(pdf)
+    if n < _PARALLEL_MIN_PAGES:
+        try:
+            return _read_pages(pdf, 0, n)
+        finally:
+            pdf.close()
+    pdf.close()
+
+    # PDFium is not thread-safe → split the page range across processes,
+    # each opening its own handle; executor.map keeps page order
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(8, os.cpu_count() or 1)
+    step = -(-n // workers)
+    chunks = [(str(pdf_path), i, min(i + step, n)) for i in range(0, n, step)]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as ex:
+        return [t for part in ex.map(_pdfium_chunk, chunks) for t in part]
+
+
+def _pdfium_chunk(args: tuple[str, int, int]) -> list[str]:
+    import pypdfium2 as pdfium
+
+    path, start, stop = args
+    pdf = pdfium.PdfDocument(path)
+    try:
+        return _read_pages(pdf, start, stop)
+    finally:
+        pdf.close()
+
+
+def _read_pages(pdf, start: int, stop: int) -> list[str]:
+    pages = []
+    for i in range(start, stop):
+        page = pdf[i]
+        textpage = page.get_textpage()
+        pages.append(_strip_cids(textpage.get_text_range().replace("\r\n", "\n")))
+        textpage.close()
+        page.close()
+    return pages
+
+
+def _pdfminer_pages(pdf_path: str | Path) -> list[str]:
+    """Single pass over the content stream – no per-page pdfplumber objects."""
+    from pdfminer.high_level import extract_text
+
+    _quiet_pdf_logs()
+    try:
+        text = extract_text(str(pdf_path))
+    except Exception:
+        return _pdfplumber_pages(pdf_path)
+    # pdfminer ends each page with \f
+    return [_strip_cids(t) for t in text.rstrip("\f").split("\f")]
+
+
+def _pdfplumber_pages(pdf_path: str | Path) -> list[str]:
+    import pdfplumber
+
+    _quiet_pdf_logs()
     with pdfplumber.open(pdf_path) as pdf:
-        pages = [p.extract_text() or "" for p in pdf.pages]
-    return _CID_RE.sub("", "\n".join(pages))
+        return [_strip_cids(p.extract_text() or "") for p in pdf.pages]
+
+
+def _quiet_pdf_logs():
+    # silence noisy PDF logging (verbose CropBox warnings) – once per process
+    global _logs_quieted
+    if _logs_quieted:
+        return
+    _logs_quieted = True
+    logging.getLogger("pdfplumber").setLevel(logging.ERROR)
+    logging.getLogger("pdfminer").setLevel(logging.ERROR)
+    warnings.filterwarnings("ignore", category=UserWarning, module="pdfminer")
+
+
+def _strip_cids(text: str) -> str:
+    # most pages carry no (cid:N) glyphs at all; the rest repeat a handful
+    if "(cid:" not in text:
+        return text
+    for tok in set(_CID_RE.findall(text)):
+        text = text.replace(tok, "")
+    return text
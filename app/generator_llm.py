@@ -2,27 +2,46 @@
 LLM-based HTML website generator.
 
 • Supports multiple LLM providers (Ollama with Devstral, OpenAI with GPT models)
-• Caches responses in .cache/html/<sha256>.html so the model is
-  queried only once per unique resume text.
+• Caches responses in .cache/html/<content hash>.html so the model is
+  queried only once per unique resume text, prompt set and model.
 • Includes basic HTML and CSS validation and a retry mechanism for fixes.
 """
 
 from __future__ import annotations
+import asyncio
+import random
 import re
+import time
 import textwrap
+from string import Template
 from pathlib import Path
-from llm_client import chat
+from html.parser import HTMLParser
+from llm_client import chat, stream_chat, is_transient_error
 from bs4 import BeautifulSoup
 import html5lib  # For HTML5 parsing
 import cssutils
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 import json  # Add json import
 from typing import Callable  # Add Callable
 
-from utils import _sha
+from utils import _atomic_write, _cache_file, _cache_key, _env_number
+import semantic_cache
 
-# Configure cssutils logging to be less verbose for common errors
-cssutils.log.setLevel(logging.CRITICAL)  # Only show critical errors from cssutils
+try:
+    from lxml import etree, html as lxml_html  # C-backed parsing
+    _BS4_PARSER = "lxml"
+except ImportError:
+    etree = lxml_html = None
+    _BS4_PARSER = "html.parser"
+
+try:
+    import tinycss2  # tokenizer-level CSS checks, much lighter than cssutils
+except ImportError:
+    tinycss2 = None
 
 # Model and cache configuration
 try:
@@ -36,10 +55,50 @@ except ImportError:
 _PROJECT_ROOT = Path(__file__).resolve().parent.parent
 _HTML_CACHE_DIR = _PROJECT_ROOT / ".cache" / "html"  # Use absolute path
 _PLAN_CACHE_DIR = _PROJECT_ROOT / ".cache" / "plans"  # Cache for plans
+_LLM_CACHE_DIR = _PROJECT_ROOT / ".cache" / "llm"  # Raw initial-generation replies
 
 _HTML_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 _PLAN_CACHE_DIR.mkdir(parents=True, exist_ok=True)  # Create plan cache directory
+_LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+# replay identical initial-generation requests (LLM_RESPONSE_CACHE=0 to always resample)
+_LLM_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE", "1") != "0"
 _MAX_FIX_ATTEMPTS = 2  # Maximum attempts to fix HTML/CSS issues
+# append a missing </html> after </body> locally before asking the LLM (AUTO_FIX_HTML=0 to always ask)
+_AUTO_FIX_ENABLED = os.getenv("AUTO_FIX_HTML", "1") != "0"
+_MAX_CHAT_RETRIES = 4  # Attempts per LLM call on transient (429/503/connection) errors
+_cooldown_until = 0.0  # monotonic time before which the provider asked us to back off
+_ABORT_CHECK_CHARS = 200  # streamed HTML replies are sanity-checked after this many chars
+_LOOP_CHECK_EVERY = 2048  # …and checked for a repetition loop this often
+_LOOP_WINDOW_CHARS = 4096
+_LOOP_TAIL_CHARS = 200
+# one LLM call for plan + HTML when no plan is cached (two-call path otherwise)
+_COMBINED_PLAN_HTML = os.getenv("COMBINED_PLAN_HTML") == "1"
+
+# Reuse pages of near-identical résumés (needs numpy + an Ollama embedding model)
+_SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE") == "1" and semantic_cache.available()
+
+# LLM output → HTML document
+_HTML_BLOCK_RE = re.compile(r"<!doctype html>.*</html>", re.IGNORECASE | re.DOTALL)
+_HTML_END_RE = re.compile(r"</html\s*>\s*\Z", re.IGNORECASE)
+_BODY_END_RE = re.compile(r"</body\s*>\s*\Z", re.IGNORECASE)
+_FENCE_RE = re.compile(r"```(?:html)?\s*(.*?)\s*```", re.DOTALL)
+
+# cache keys ignore whitespace layout – re-extracting a PDF often only moves line breaks
+_WS_RUN_RE = re.compile(r"\s+")
+
+# the validator only looks at <style> blocks – raw text in HTML, so no tree is needed;
+# comments and scripts are matched (and skipped) first so "<style>" inside them is ignored
+_STYLE_BLOCK_RE = re.compile(
+    r"<!--.*?(?:-->|\Z)|<script\b.*?(?:</script\s*>|\Z)|<style\b[^>]*>(.*?)</style\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# CSS property scans used when summarising changes
+_HEADING_TAGS = frozenset(('h1', 'h2', 'h3', 'h4'))
+_RE_COLOR = re.compile(r"color:\s*([^;]+)")
+_RE_BACKGROUND = re.compile(r"background[^:]*:\s*([^;]+)")
+_RE_FONT_FAMILY = re.compile(r"font-family:\s*([^;]+)")
+
 _SYSTEM_PROMPT_PLAN = textwrap.dedent(
     f"""\
 You are an expert resume analyzer and web planner. Your job is to parse a given text and produce a structured plan for a personal resume website with multiple pages.
@@ -199,12 +258,36 @@ You are a seasoned front-end web developer. Using the website_plan and the origi
   - No Extra Text: Output only the raw HTML code. Do not include any explanation, comments (unless necessary HTML comments), or Markdown. Do not wrap the HTML in code fences.
 
 Generate the complete single-file HTML website containing all sections from {{website_plan}}, following these guidelines.
+"""
+)
 
+# Variable parts go in the user message so the system prompt stays a constant prefix
+_USER_PROMPT_HTML = Template(
+    textwrap.dedent(
+        """\
 Website Plan:
-{{{{website_plan}}}}
+$website_plan
 
 Résumé Text:
-{{{{resume_text}}}}
+$resume_text
+
+Generate the HTML website based on the provided plan and resume text.
+"""
+    )
+)
+
+# Single-call variant: plan, marker line, then the page (COMBINED_PLAN_HTML=1)
+_HTML_MARKER = "=====HTML====="
+_SYSTEM_PROMPT_PLAN_AND_HTML = textwrap.dedent(
+    f"""\
+You will complete two tasks in ONE reply, in this order.
+
+TASK 1 – WEBSITE PLAN
+{_SYSTEM_PROMPT_PLAN}
+TASK 2 – HTML WEBSITE (only when the text is a resume)
+Rule 4 of Task 1 is relaxed: after the YAML plan, output a line containing exactly {_HTML_MARKER} and then the complete HTML document. If the text is not a resume, stop after the IS_RESUME: FALSE notice. Use your Task 1 plan as the website_plan and the user's message as the resume_text in the instructions below.
+
+{_SYSTEM_PROMPT_HTML}
 """
 )
 
@@ -213,29 +296,37 @@ _SYSTEM_PROMPT_FIX_HTML = textwrap.dedent(
 You are an expert web developer. You previously generated HTML code that had some issues.
 Your task is to fix the provided HTML code based on the validation errors.
 
+Instructions:
+1.  Carefully analyze the validation errors.
+2.  Modify ONLY the problematic parts of the `previous_html` to fix these errors.
+3.  Ensure all CSS is in `<style>` tags or inline, and all JS is in `<script>` tags.
+4.  The output should be the complete, corrected HTML code, starting with `<!DOCTYPE html>` and ending with `</html>`.
+5.  Do NOT include any markdown fences (like \\`\\`\\`html) or any other text, comments, or explanations outside the HTML itself.
+"""
+)
+
+_USER_PROMPT_FIX_HTML = Template(
+    textwrap.dedent(
+        """\
 Original Résumé Text (for context, do not regenerate from this, only fix the HTML):
-{{{{resume_text}}}}
+$resume_text
 
 Website Plan (for context):
-{{{{website_plan}}}}
+$website_plan
 
 Previously Generated HTML (with issues):
 ```html
-{{{{previous_html}}}}
+$previous_html
 ```
 
 Validation Errors:
 ```
-{{{{errors}}}}
+$errors
 ```
 
-Instructions:
-1.  Carefully analyze the validation errors.
-2.  Modify ONLY the problematic parts of the `previous_html` to fix these errors.
-3.  Ensure all CSS is in `<style>` tags or inline, and all JS is in `<script>` tags.
-4.  The output should be the complete, corrected HTML code, starting with `<!DOCTYPE html>` and ending with `</html>`.
-5.  Do NOT include any markdown fences (like \\`\\`\\`html) or any other text, comments, or explanations outside the HTML itself.
+Fix the provided HTML based on the errors.
 """
+    )
 )
 
 _SYSTEM_PROMPT_USER_CHANGES = textwrap.dedent(
@@ -243,20 +334,6 @@ _SYSTEM_PROMPT_USER_CHANGES = textwrap.dedent(
 You are an expert web developer helping a user refine their personal website.
 The user has a generated website and wants to make specific changes to improve it.
 
-Current Website HTML:
-```html
-{{{{current_html}}}}
-```
-
-Original Résumé Text (for context):
-{{{{resume_text}}}}
-
-Website Plan (for context):
-{{{{website_plan}}}}
-
-User's Change Request:
-{{{{user_request}}}}
-
 Instructions:
 1. Carefully read and understand the user's change request.
 2. Apply the requested changes to the current HTML while maintaining the overall structure and quality.
@@ -279,37 +356,169 @@ If you cannot implement a specific feature due to complexity, make a simpler ver
 """
 )
 
+_USER_PROMPT_USER_CHANGES = Template(
+    textwrap.dedent(
+        """\
+Current Website HTML:
+```html
+$current_html
+```
+
+Original Résumé Text (for context):
+$resume_text
+
+Website Plan (for context):
+$website_plan
+
+User's Change Request:
+$user_request
+
+Please apply the following changes to my website: $user_request
+"""
+    )
+)
+# Plan/HTML cache keys include the prompts that produced them and the model, so
+# editing a prompt or switching model regenerates instead of serving stale entries
+_PLAN_PROMPT_KEY = _cache_key(_SYSTEM_PROMPT_PLAN)
+_HTML_PROMPT_KEY = _cache_key(
+    _SYSTEM_PROMPT_HTML, "||", _USER_PROMPT_HTML.template, "||",
+    _SYSTEM_PROMPT_PLAN_AND_HTML, "||",
+    _SYSTEM_PROMPT_FIX_HTML, "||", _USER_PROMPT_FIX_HTML.template,
+)
+
+
+def _semantic_index(model: str | None) -> Path:
+    # one index per prompt set + model – pages from older prompts or another model never match
+    return _HTML_CACHE_DIR / f"index-{_cache_key(_HTML_PROMPT_KEY, '||', model or _MODEL)[:16]}.npz"
+
+
 def _extract_html(raw_html_output: str) -> str:
     """
     Extracts HTML content from the LLM's raw output.
     Tries to find <!DOCTYPE html>...</html> block.
     Also handles markdown code fences like ```html ... ```.
     """
-    # Attempt to find the core HTML structure
-    doctype_start = raw_html_output.lower().find("<!doctype html>")
-    html_end_tag = "</html>"
-    html_end = raw_html_output.lower().rfind(html_end_tag)
+    # Attempt to find the core HTML structure (first doctype through last </html>)
+    if m := _HTML_BLOCK_RE.search(raw_html_output):
+        return m.group(0)
 
-    if doctype_start != -1 and html_end != -1 and doctype_start < html_end:
-        # Extract from <!doctype html> to </html>
-        return raw_html_output[doctype_start : html_end + len(html_end_tag)]
-
-    # Fallback for markdown code blocks
+    # Fallback for markdown code blocks (```html ... ``` or generic backticks)
     stripped_output = raw_html_output.strip()
-    if stripped_output.startswith("```html") and stripped_output.endswith("```"):
-        return stripped_output[7:-3].strip()
-    if stripped_output.startswith("```") and stripped_output.endswith(
-        "```"
-    ):  # Generic backticks
-        return stripped_output[3:-3].strip()
+    if m := _FENCE_RE.fullmatch(stripped_output):
+        return m.group(1)
 
     # If no specific markers found, return the stripped output, hoping it's clean HTML
     return stripped_output
 
 
-def _validate_html_css(html_content: str) -> list[str]:
-    """Validates HTML structure and inline CSS. Returns a list of error messages."""
+# at-rules whose block holds declarations rather than nested rules
+_CSS_DECLARATION_AT_RULES = frozenset(("font-face", "page", "counter-style", "property"))
+
+# cssutils reports problems through logging; each thread collects into its own list
+_css_local = threading.local()
+_css_pool: ThreadPoolExecutor | None = None
+
+
+class CaptureCSSLogHandler(logging.Handler):
+    """Collects cssutils log records into the current thread's error list."""
+
+    def emit(self, record):
+        error_list = getattr(_css_local, "errors", None)
+        if error_list is not None:
+            # record.getMessage() gives the formatted log message from cssutils
+            error_list.append(f"CSS Error in <style> tag: {record.getMessage()}")
+
+
+_CSS_CAPTURE = CaptureCSSLogHandler()
+
+# cssutils logs through one global handler ("CSSUTILS" logger) and flips global raise
+# settings while it parses – route it once to a private logger that only feeds the
+# capture handler (silent outside validation), and never run two of its parses at once
+_CSS_LOG = logging.getLogger("resume2site.cssutils")
+_CSS_LOG.propagate = False
+_CSS_LOG.setLevel(logging.INFO)  # Capture INFO (warnings) and ERROR messages
+_CSS_LOG.addHandler(_CSS_CAPTURE)
+cssutils.log.setLog(_CSS_LOG)
+_CSSUTILS_LOCK = threading.Lock()
+
+
+def _css_parser() -> cssutils.CSSParser:
+    # CSSParser keeps parse state on the instance – one per thread, reused across calls
+    parser = getattr(_css_local, "parser", None)
+    if parser is None:
+        parser = _css_local.parser = cssutils.CSSParser(
+            validate=True,
+            raiseExceptions=False,  # We are capturing logs, not exceptions
+        )
+    return parser
+
+
+def _tinycss2_errors(rules) -> list[str]:
     errors = []
+    for rule in rules:
+        if rule.type == "error":
+            errors.append(
+                f"CSS Error in <style> tag: line {rule.source_line}:{rule.source_column}: {rule.message}"
+            )
+        elif rule.type == "qualified-rule" or (
+            rule.type == "at-rule" and rule.lower_at_keyword in _CSS_DECLARATION_AT_RULES
+        ):
+            errors.extend(_tinycss2_errors(tinycss2.parse_declaration_list(
+                rule.content, skip_comments=True, skip_whitespace=True
+            )))
+        elif rule.type == "at-rule" and rule.content is not None:
+            # @media, @supports, @keyframes … wrap nested rules
+            errors.extend(_tinycss2_errors(tinycss2.parse_rule_list(
+                rule.content, skip_comments=True, skip_whitespace=True
+            )))
+    return errors
+
+
+def _parse_one_style(css_text: str) -> list[str]:
+    if tinycss2 is not None:
+        return _tinycss2_errors(
+            tinycss2.parse_stylesheet(css_text, skip_comments=True, skip_whitespace=True)
+        )
+    _css_local.errors = errors = []
+    try:
+        with _CSSUTILS_LOCK:
+            _css_parser().parseString(css_text)
+    finally:
+        _css_local.errors = None
+    return errors
+
+
+def _get_css_pool() -> ThreadPoolExecutor:
+    global _css_pool
+    if _css_pool is None:
+        _css_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="css-validate")
+    return _css_pool
+
+
+def _lxml_html_errors(html_content: str) -> list[str]:
+    """First structural error reported by libxml2, in the html5lib message format."""
+    parser = lxml_html.HTMLParser(recover=False, encoding="utf-8")
+    try:
+        etree.fromstring(html_content.encode("utf-8"), parser)
+    except etree.XMLSyntaxError as e:
+        # e.error_log accumulates across parses; the parser's own log is reset per parse
+        # libxml2 predates HTML5 and flags <header>, <nav>, <section>… as unknown tags
+        for entry in parser.error_log:
+            if entry.type_name != "HTML_UNKNOWN_TAG":
+                return [f"HTML ParseError: line {entry.line}:{entry.column}: {entry.message}"]
+        if not len(parser.error_log):
+            return [f"HTML ParseError: line {e.lineno}:{e.offset}: {e.msg}"]
+    return []
+
+
+def _html_errors(html_content: str) -> list[str]:
+    # neither parser objects to a document that simply stops – catch replies cut off at max_tokens
+    if not _HTML_END_RE.search(html_content):
+        return ["HTML ParseError: document ends before </html> (truncated reply?)"]
+    # libxml2 is C-fast but misses unclosed comments, truncated attributes, bad entities
+    # and duplicate attributes – HTML_VALIDATOR=html5lib for the strict HTML5 check
+    if lxml_html is not None and os.getenv("HTML_VALIDATOR", "lxml").lower() != "html5lib":
+        return _lxml_html_errors(html_content)
     try:
         # HTML validation using html5lib (which is strict)
         parser = html5lib.HTMLParser(strict=True)
@@ -318,52 +527,267 @@ def _validate_html_css(html_content: str) -> list[str]:
         # For more detailed validation, a dedicated HTML validator tool/API would be needed.
 
     except html5lib.html5parser.ParseError as e:
-        errors.append(f"HTML ParseError: {str(e)}")
+        return [f"HTML ParseError: {str(e)}"]
+    return []
+
+
+def _validate_html_css(html_content: str) -> list[str]:
+    """Validates HTML structure and inline CSS. Returns a list of error messages."""
+    # validation is pure – identical output from a fix attempt or a re-run is free
+    return list(_validate_cached(html_content))
+
 
+@lru_cache(maxsize=32)
+def _validate_cached(html_content: str) -> tuple[str, ...]:
     # CSS validation (for <style> tags)
-    soup = BeautifulSoup(html_content, "html.parser")
-    css_logger = logging.getLogger("cssutils")
-
-    for style_tag in soup.find_all("style"):
-        if style_tag.string:
-            css_text = style_tag.string
-            current_css_errors = []
-
-            class CaptureCSSLogHandler(logging.Handler):
-                def __init__(self, error_list):
-                    super().__init__()
-                    self.error_list = error_list
-
-                def emit(self, record):
-                    # record.getMessage() gives the formatted log message from cssutils
-                    self.error_list.append(
-                        f"CSS Error in <style> tag: {record.getMessage()}"
-                    )
-
-            capture_handler = CaptureCSSLogHandler(current_css_errors)
-
-            original_level = css_logger.level
-            original_handlers = list(css_logger.handlers)  # Make a copy
-
-            css_logger.addHandler(capture_handler)
-            css_logger.setLevel(
-                logging.INFO
-            )  # Capture INFO (warnings) and ERROR messages
-
-            parser = cssutils.CSSParser(
-                validate=True,
-                raiseExceptions=False,  # We are capturing logs, not exceptions
-            )
-            stylesheet = parser.parseString(css_text)
+    css_texts = [css for css in _STYLE_BLOCK_RE.findall(html_content) if css]  # "" for comments/scripts
+    if len(css_texts) > 1:
+        # style sheets parse on the pool while the HTML check runs here
+        css_results = _get_css_pool().map(_parse_one_style, css_texts)
+    else:
+        css_results = map(_parse_one_style, css_texts)
+    errors = _html_errors(html_content)
+    for css_errors in css_results:
+        errors.extend(css_errors)
 
-            # Restore logger state
-            css_logger.setLevel(original_level)
-            css_logger.handlers = original_handlers  # Restore original handlers
-            # More precise: css_logger.removeHandler(capture_handler) if sure no other changes happened
+    return tuple(errors)
 
-            errors.extend(current_css_errors)
 
-    return errors
+# elements without an end tag – never left "open" at the end of a document
+_VOID_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+))
+
+
+class _OpenTags(HTMLParser):
+    """Elements still open where a document stops."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in _VOID_TAGS:
+            self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        pass  # <path/>, <br/> – opened and closed in one go
+
+    def handle_endtag(self, tag):
+        if tag in self.stack:
+            del self.stack[len(self.stack) - 1 - self.stack[::-1].index(tag):]
+
+
+def _auto_fix_html(html_content: str) -> str | None:
+    """
+    The one repair done without the LLM: a page that ends with an explicit
+    </body> but no </html> gets </html> appended. Anything else – a reply
+    cut off inside <body> (even between two sections), broken CSS –
+    returns None and goes to the fix prompt, so nothing the user would see
+    is dropped.
+    """
+    if _HTML_END_RE.search(html_content) or not _BODY_END_RE.search(html_content):
+        return None
+    tags = _OpenTags()
+    tags.feed(html_content)
+    # rawdata holds an unfinished tag or comment; anything but <html> left open means truncation
+    if tags.rawdata or tags.stack != ["html"]:
+        return None
+    return f"{html_content.rstrip()}\n</html>\n"
+
+
+def _call_with_retry(call: Callable[[], object], max_retries: int = _MAX_CHAT_RETRIES):
+    """Run an LLM call with exponential backoff and jitter on transient provider errors."""
+    global _cooldown_until
+    for attempt in range(max_retries):
+        # another call just hit a rate limit – wait it out instead of burning a request
+        if (wait := _cooldown_until - time.monotonic()) > 0:
+            time.sleep(wait)
+        try:
+            return call()
+        except Exception as e:
+            if attempt == max_retries - 1 or not is_transient_error(e):
+                raise
+            delay = min(2 ** attempt + random.random(), 30)
+            print(f"LLM call failed ({e}); retrying in {delay:.1f}s")
+            if getattr(e, "status_code", None) == 429:
+                _cooldown_until = max(_cooldown_until, time.monotonic() + delay)
+            time.sleep(delay)
+
+
+def _chat_with_retry(messages: list[dict], model: str | None = None):
+    """chat() with retries on transient errors."""
+    return _call_with_retry(lambda: chat(model=model or _MODEL, messages=messages))
+
+
+def _looks_like_html_start(text: str) -> bool:
+    head = text.lower()
+    return "<!doctype" in head or "<html" in head or "```" in head
+
+
+def _is_looping(window: str) -> bool:
+    # a degenerate model repeats the same chunk until it hits max tokens
+    tail = window[-_LOOP_TAIL_CHARS:]
+    return len(window) >= 4 * _LOOP_TAIL_CHARS and window.count(tail) >= 4
+
+
+def _stream_html_reply(
+    messages: list[dict], model: str | None = None, stop: threading.Event | None = None
+) -> str:
+    """
+    Streams an HTML-producing reply and cuts it short when waiting is pointless:
+    • the first _ABORT_CHECK_CHARS characters show no sign of a page (an
+      apology, prose) or the model starts repeating itself → restart once;
+    • </html> has arrived after a doctype → the page is complete, trailing
+      chatter is not waited for.
+    Setting `stop` ends the stream early.
+    """
+    for may_restart in (True, False):
+        parts: list[str] = []
+        size = 0
+        started = has_doctype = False
+        next_loop_check = _LOOP_CHECK_EVERY
+        for piece in stream_chat(model=model or _MODEL, messages=messages):
+            if stop is not None and stop.is_set():
+                return "".join(parts)
+            parts.append(piece)
+            size += len(piece)
+            if not started and size >= _ABORT_CHECK_CHARS:
+                started = True
+                head = "".join(parts)
+                has_doctype = "<!doctype" in head.lower()
+                if may_restart and not _looks_like_html_start(head):
+                    print("LLM reply does not look like HTML; restarting generation.")
+                    break
+            if has_doctype and "</html>" in "".join(parts[-8:]).lower():
+                return "".join(parts)
+            if size >= next_loop_check:
+                next_loop_check += _LOOP_CHECK_EVERY
+                if _is_looping("".join(parts)[-_LOOP_WINDOW_CHARS:]):
+                    print("LLM reply is repeating itself; stopping generation.")
+                    if may_restart:
+                        break
+                    return "".join(parts)
+        else:
+            return "".join(parts)
+    return "".join(parts)
+
+
+def _first_valid_reply(messages: list[dict], model: str | None, candidates: int) -> str:
+    """
+    Streams `candidates` generations at once and returns the first one that
+    validates; the others are stopped. Falls back to the first finished reply.
+    """
+    stop = threading.Event()
+    fallback: str | None = None
+    failure: Exception | None = None
+    pool = ThreadPoolExecutor(max_workers=candidates, thread_name_prefix="html-candidate")
+    try:
+        futures = [
+            pool.submit(_call_with_retry, lambda: _stream_html_reply(messages, model, stop))
+            for _ in range(candidates)
+        ]
+        for future in as_completed(futures):
+            try:
+                raw_output = future.result()
+            except Exception as e:
+                failure = e
+                continue
+            if not _validate_html_css(_extract_html(raw_output)):
+                return raw_output
+            if fallback is None:
+                fallback = raw_output
+    finally:
+        # don't wait for the losers: a queued stream (OLLAMA_NUM_PARALLEL=1) would only
+        # notice `stop` at its next chunk, after the winner's whole generation
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    if fallback is None:
+        raise failure
+    return fallback
+
+
+def _cached_reply(messages: list[dict], model: str | None, fetch: Callable[[], str]) -> str:
+    """
+    Reply for an identical (model, messages) initial-generation request from
+    .cache/llm, else fetch() – a re-run after an interrupted fix loop skips the
+    first generation. Only complete pages are stored: a reply cut short (loop
+    detection, stop event, max tokens) is never replayed.
+    """
+    if not _LLM_CACHE_ENABLED:
+        return fetch()
+    request = json.dumps([model or _MODEL, messages], ensure_ascii=False)
+    path = _cache_file(_LLM_CACHE_DIR, ".json", request)
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))["content"]
+    content = fetch()
+    if _HTML_BLOCK_RE.search(content):
+        _atomic_write(path, json.dumps({"content": content}))
+    return content
+
+
+@lru_cache(maxsize=16)
+def _read_html_cache(path: Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def _load_cached_html(path: Path) -> str | None:
+    """Cached page for `path`, or None. Repeat hits (Streamlit reruns) skip the disk."""
+    try:
+        return _read_html_cache(path)
+    except FileNotFoundError:  # misses raise, so they are never memoised
+        return None
+
+
+def _emit(status_callback: Callable[[str], None] | None, *lines: str) -> None:
+    # one callback (= one UI update in Streamlit) per step instead of one per line
+    if status_callback:
+        status_callback("\n".join(lines))
+
+
+def _key_text(text: str) -> str:
+    return _WS_RUN_RE.sub(" ", text).strip()
+
+
+def _plan_cache_path(raw_text: str, model: str | None) -> Path:
+    return _cache_file(
+        _PLAN_CACHE_DIR, ".json", _PLAN_PROMPT_KEY, "||", model or _MODEL, "||", _key_text(raw_text)
+    )
+
+
+def _parse_plan_output(plan_output: str) -> dict:
+    """Turns the planner's raw reply into {"is_resume", "plan", "reason"}."""
+    plan_output = plan_output.strip()
+    first_line = plan_output.removeprefix("```yaml").removeprefix("```").lstrip().split("\n", 1)[0]
+    if "IS_RESUME: TRUE" in first_line:
+        return {"is_resume": True, "plan": plan_output, "reason": None}
+
+    for label in ("REASON:", "Explanation:"):  # the prompt asks for "Explanation:"
+        if label in plan_output:
+            reason = plan_output.split(label, 1)[1].strip()
+            break
+    else:
+        reason = "Could not determine reason for invalid resume (output format unexpected)."
+    return {"is_resume": False, "plan": None, "reason": reason}
+
+
+@lru_cache(maxsize=16)  # entries are content-addressed, never rewritten; callers only read
+def _load_plan_cache(plan_cache_path: Path) -> dict:
+    return json.loads(plan_cache_path.read_text(encoding="utf-8"))
+
+
+def _save_plan_cache(plan_cache_path: Path, parsed: dict) -> None:
+    _atomic_write(plan_cache_path, json.dumps(parsed))
+
+
+def _report_plan(parsed: dict, status_callback: Callable[[str], None] | None) -> None:
+    if not status_callback:
+        return
+    if parsed["is_resume"]:
+        status_callback("📝 Plan generated successfully.")
+    else:
+        status_callback(f"⚠️ Not a valid resume. Reason: {parsed['reason']}")
 
 
 def _generate_website_plan(
@@ -378,31 +802,13 @@ def _generate_website_plan(
     Returns:
         A tuple: (plan_text_or_none, is_resume_bool, reason_if_not_resume_or_none)
     """
-    cache_key = _sha(raw_text)
-    plan_cache_path = _PLAN_CACHE_DIR / f"{cache_key}.txt"  # Store as text file
+    plan_cache_path = _plan_cache_path(raw_text, model)
 
     if plan_cache_path.exists():
         if status_callback:
             status_callback("📄 Found cached website plan.")
-        cached_content = plan_cache_path.read_text(encoding="utf-8")
-
-        is_resume_line = cached_content.split("\\n", 1)[0]
-        is_resume = "IS_RESUME: TRUE" in is_resume_line
-
-        if is_resume:
-            # Ensure "PLAN:" exists before splitting
-            if "PLAN:" in cached_content:
-                plan_content = cached_content.split("PLAN:", 1)[1].strip()
-            else:  # Fallback if format is slightly off but IS_RESUME is TRUE
-                plan_content = "Plan details not found in expected format in cache."
-            return plan_content, True, None
-        else:
-            # Ensure "REASON:" exists before splitting
-            if "REASON:" in cached_content:
-                reason_content = cached_content.split("REASON:", 1)[1].strip()
-            else:  # Fallback if format is slightly off
-                reason_content = "Reason not found in expected format in cache."
-            return None, False, reason_content
+        cached = _load_plan_cache(plan_cache_path)
+        return cached["plan"], cached["is_resume"], cached["reason"]
 
     if status_callback:
         status_callback("🧠 Analyzing resume and generating website plan...")
@@ -411,30 +817,50 @@ def _generate_website_plan(
         {"role": "system", "content": _SYSTEM_PROMPT_PLAN},
         {"role": "user", "content": raw_text},
     ]
-    rsp = chat(model=model or _MODEL, messages=messages)
-    plan_output = rsp.message.content.strip()
+    rsp = _chat_with_retry(messages, model)
+    parsed = _parse_plan_output(rsp.message.content)
 
-    # Save the raw output to cache
-    plan_cache_path.write_text(plan_output, encoding="utf-8")
+    _save_plan_cache(plan_cache_path, parsed)
+    _report_plan(parsed, status_callback)
+    return parsed["plan"], parsed["is_resume"], parsed["reason"]
 
-    is_resume_line = plan_output.split("\\n", 1)[0]
-    is_resume = "IS_RESUME: TRUE" in is_resume_line
 
-    if is_resume:
-        # For a valid resume, return the plan content after "IS_RESUME: TRUE"
-        plan_content = plan_output.strip()
-        if status_callback:
-            status_callback("📝 Plan generated successfully.")
-        return plan_content, True, None
-    else:
-        # Ensure "REASON:" exists before splitting
-        if "REASON:" in plan_output:
-            reason_content = plan_output.split("REASON:", 1)[1].strip()
-        else:
-            reason_content = "Could not determine reason for invalid resume (output format unexpected)."
-        if status_callback:
-            status_callback(f"⚠️ Not a valid resume. Reason: {reason_content}")
-        return None, False, reason_content
+def _generate_plan_and_html(
+    raw_text: str,
+    status_callback: Callable[[str], None] | None = None,
+    model: str | None = None
+) -> tuple[str | None, bool, str | None, str | None]:
+    """
+    Like _generate_website_plan, but asks for the plan and the HTML in one reply.
+    The plan is cached exactly as the two-call path caches it.
+
+    Returns:
+        A tuple: (plan_or_none, is_resume_bool, reason_or_none, raw_html_or_none)
+        raw_html is None for a non-resume, and when the model left out the HTML
+        part – the plan then comes from a separate _generate_website_plan call.
+    """
+    if status_callback:
+        status_callback("🧠 Analyzing resume and generating website plan and HTML in one pass...")
+
+    messages = [
+        {"role": "system", "content": _SYSTEM_PROMPT_PLAN_AND_HTML},
+        {"role": "user", "content": raw_text},
+    ]
+    rsp = _chat_with_retry(messages, model)
+    plan_output, marker, html_output = rsp.message.content.partition(_HTML_MARKER)
+    parsed = _parse_plan_output(plan_output)
+
+    if parsed["is_resume"] and not marker:
+        # without the marker there is no telling where the plan ends – the "plan" may be
+        # the whole reply, page included; never cache that, ask for the plan on its own
+        print("Combined reply has no HTML marker; generating the plan separately.")
+        return (*_generate_website_plan(raw_text, status_callback, model), None)
+
+    _save_plan_cache(_plan_cache_path(raw_text, model), parsed)
+    _report_plan(parsed, status_callback)
+    if not parsed["is_resume"]:
+        html_output = None
+    return parsed["plan"], parsed["is_resume"], parsed["reason"], html_output
 
 
 def generate_html_llm(
@@ -449,8 +875,25 @@ def generate_html_llm(
     Args:
         raw_text: The raw text from the resume.
         status_callback: An optional function to call with status updates.
-    """    # Step 1: Generate/retrieve website plan
-    website_plan, is_resume, reason = _generate_website_plan(raw_text, status_callback, model)
+    """    # Step 0: the same person's near-identical résumé already has a page → no plan call either
+    resume_vec = semantic_cache.embed(raw_text) if _SEMANTIC_CACHE_ENABLED else None
+    resume_id = semantic_cache.identity(raw_text) if resume_vec is not None else ""
+    near_key = resume_vec is not None and semantic_cache.nearest(
+        resume_vec, resume_id, _semantic_index(model)
+    )
+    if near_key and (cached_html := _load_cached_html(_HTML_CACHE_DIR / f"{near_key}.html")) is not None:
+        if status_callback:
+            status_callback("📄 Found cached Website for a near-identical resume.")
+        return cached_html
+
+    # Step 1: Generate/retrieve website plan
+    combined_html = None  # initial HTML when it came with the plan
+    if _COMBINED_PLAN_HTML and not _plan_cache_path(raw_text, model).exists():
+        website_plan, is_resume, reason, combined_html = _generate_plan_and_html(
+            raw_text, status_callback, model
+        )
+    else:
+        website_plan, is_resume, reason = _generate_website_plan(raw_text, status_callback, model)
 
     if not is_resume:
         error_message = (
@@ -473,73 +916,77 @@ def generate_html_llm(
         status_callback("⏳ Now generating Website based on this plan...")
 
     # Step 2: Generate HTML based on the plan and resume text
-    # HTML cache key is based on raw_text + plan_text to ensure plan changes trigger regeneration
-    html_cache_key_content = raw_text + "||PLAN||" + website_plan
-    cache_path = _HTML_CACHE_DIR / f"{_sha(html_cache_key_content)}.html"
+    # HTML cache key is based on prompts + model + raw_text + plan_text to ensure changes trigger regeneration
+    cache_path = _cache_file(
+        _HTML_CACHE_DIR, ".html", _HTML_PROMPT_KEY, "||", model or _MODEL, "||",
+        _key_text(raw_text), "||PLAN||", _key_text(website_plan),
+    )
 
-    if cache_path.exists():
+    if (cached_html := _load_cached_html(cache_path)) is not None:
         if status_callback:
             status_callback("📄 Found cached Website (post-plan).")
-        return cache_path.read_text(encoding="utf-8")
+        return cached_html
 
     current_html = ""
     last_errors: list[str] = []
+    # initial pages generated side by side; the first to validate wins (costs N× tokens)
+    candidates = max(1, _env_number("HTML_CANDIDATES", 1, int))
 
     # --- Stage 1: HTML Generation and Validation ---
     for attempt in range(_MAX_FIX_ATTEMPTS + 1):
         if attempt == 0:
             # Initial generation attempt
-            if status_callback:
+            if status_callback and combined_html is None:
                 status_callback(
                     f"🤖 Attempt {attempt + 1}/{_MAX_FIX_ATTEMPTS + 1}: Calling LLM for initial Website generation (using plan)..."
                 )
 
-            current_system_prompt_html = _SYSTEM_PROMPT_HTML.replace(
-                "{{website_plan}}", website_plan
-            )
-            current_system_prompt_html = current_system_prompt_html.replace(
-                "{{resume_text}}", raw_text
-            )
-
             messages = [
-                {"role": "system", "content": current_system_prompt_html},
+                {"role": "system", "content": _SYSTEM_PROMPT_HTML},
                 {
                     "role": "user",
-                    "content": "Generate the HTML website based on the provided plan and resume text.",
+                    "content": _USER_PROMPT_HTML.substitute(
+                        website_plan=website_plan, resume_text=raw_text
+                    ),
                 },
             ]
         else:
-            # Fixing attempt
-            if status_callback:
-                status_callback(
-                    f"🛠️ Attempt {attempt + 1}/{_MAX_FIX_ATTEMPTS + 1}: Trying to fix Website. Errors: {len(last_errors)}"
-                )
-
-            prompt_fix = _SYSTEM_PROMPT_FIX_HTML.replace("{{resume_text}}", raw_text)
-            prompt_fix = prompt_fix.replace(
-                "{{website_plan}}", website_plan
-            )  # Add plan to fix prompt
-            prompt_fix = prompt_fix.replace("{{previous_html}}", current_html)
-            prompt_fix = prompt_fix.replace("{{errors}}", "\\n".join(last_errors))
-
+            # Fixing attempt (announced together with the failed validation below)
             messages = [
-                {"role": "system", "content": prompt_fix},                {
+                {"role": "system", "content": _SYSTEM_PROMPT_FIX_HTML},
+                {
                     "role": "user",
-                    "content": "Fix the provided HTML based on the errors.",
-                },  # Simplified user message
+                    "content": _USER_PROMPT_FIX_HTML.substitute(
+                        resume_text=raw_text,
+                        website_plan=website_plan,  # Add plan to fix prompt
+                        previous_html=current_html,
+                        errors="\n".join(last_errors),
+                    ),
+                },
             ]
 
-        rsp = chat(model=model or _MODEL, messages=messages)
-        raw_output = rsp.message.content
+        if attempt == 0 and combined_html is not None:
+            raw_output = combined_html  # generated together with the plan
+        elif attempt == 0 and candidates > 1:
+            raw_output = _first_valid_reply(messages, model, candidates)
+        elif attempt == 0:
+            raw_output = _cached_reply(
+                messages, model, lambda: _call_with_retry(lambda: _stream_html_reply(messages, model))
+            )
+        else:
+            # fix attempts always resample – an unchanged page makes the next fix prompt
+            # byte-identical, and replaying its reply would burn the remaining attempts
+            raw_output = _call_with_retry(lambda: _stream_html_reply(messages, model))
         current_html = _extract_html(raw_output)
 
-        if status_callback:
-            status_callback("🔍 Validating generated Website (HTML/CSS)...")
         validation_errors = _validate_html_css(current_html)
 
+        if validation_errors and _AUTO_FIX_ENABLED and (repaired := _auto_fix_html(current_html)):
+            if not _validate_html_css(repaired):  # no LLM round trip for missing end tags
+                print("Validation errors repaired locally.")
+                current_html, validation_errors = repaired, []
+
         if not validation_errors:
-            if status_callback:
-                status_callback("✅ Website (HTML/CSS) validation passed!")
             print("HTML/CSS validation passed.")
             # HTML is valid, break this loop and proceed to visual analysis or caching
             break
@@ -550,10 +997,15 @@ def generate_html_llm(
         )
         for err_item in last_errors:  # Renamed err to err_item to avoid conflict
             print(f"- {err_item}")
-        if status_callback:
-            status_callback(
-                f"⚠️ Validation failed (Attempt {attempt + 1}/{_MAX_FIX_ATTEMPTS + 1}). Errors: {len(last_errors)}"
+        failed_message = f"⚠️ Validation failed (Attempt {attempt + 1}/{_MAX_FIX_ATTEMPTS + 1}). Errors: {len(last_errors)}"
+        if attempt < _MAX_FIX_ATTEMPTS:
+            _emit(
+                status_callback,
+                failed_message,
+                f"🛠️ Attempt {attempt + 2}/{_MAX_FIX_ATTEMPTS + 1}: Trying to fix Website. Errors: {len(last_errors)}",
             )
+        elif status_callback:
+            status_callback(failed_message)
 
         if (
             attempt == _MAX_FIX_ATTEMPTS
@@ -562,17 +1014,61 @@ def generate_html_llm(
             if status_callback:
                 status_callback(f"❌ {final_failure_message}")
             print(final_failure_message)
-            cache_path.write_text(
-                current_html, encoding="utf-8"
-            )  # Cache the last attempt anyway
+            _atomic_write(cache_path, current_html)  # Cache the last attempt anyway
             return current_html
 
-    if status_callback:
-        status_callback("💾 Caching final website version.")
-    cache_path.write_text(current_html, encoding="utf-8")
+    _emit(
+        status_callback,
+        "✅ Website (HTML/CSS) validation passed!",
+        "💾 Caching final website version.",
+    )
+    _atomic_write(cache_path, current_html)
+    if resume_vec is not None:  # only validated pages are offered to similar résumés
+        try:
+            semantic_cache.add(resume_vec, cache_path.stem, resume_id, _semantic_index(model))
+        except Exception as e:  # the page is cached already – a lost index entry only costs a lookup
+            print(f"Could not update the semantic cache index: {e}")
     return current_html
 
 
+async def generate_html_llm_async(
+    raw_text: str,
+    status_callback: Callable[[str], None] | None = None,
+    model: str | None = None
+) -> str:
+    """
+    Awaitable generate_html_llm for batch runs, e.g.
+    ``await asyncio.gather(*(generate_html_llm_async(t) for t in texts))``.
+
+    Each résumé runs in a worker thread, so the LLM round-trips overlap
+    (Ollama serves them together when OLLAMA_NUM_PARALLEL allows).
+    """
+    return await asyncio.to_thread(generate_html_llm, raw_text, status_callback, model)
+
+
+async def generate_html_llm_batch(
+    raw_texts: list[str],
+    model: str | None = None,
+    concurrency: int | None = None
+) -> list[str]:
+    """
+    Generates one website per résumé, at most `concurrency` at a time
+    (LLM_CONCURRENCY, default 4). Results keep the order of `raw_texts`;
+    a résumé that fails yields "" like a rejected one, the rest carry on.
+    """
+    limit = asyncio.Semaphore(max(1, concurrency or _env_number("LLM_CONCURRENCY", 4, int)))
+
+    async def one(raw_text: str) -> str:
+        async with limit:
+            try:
+                return await generate_html_llm_async(raw_text, model=model)
+            except Exception as e:
+                print(f"Batch generation failed: {e}")
+                return ""
+
+    return await asyncio.gather(*(one(t) for t in raw_texts))
+
+
 def apply_user_changes_llm(
     current_html: str,
     user_request: str,
@@ -598,16 +1094,16 @@ def apply_user_changes_llm(
         status_callback("🔄 Processing your change request...")
 
     # Prepare the prompt with user request and current HTML
-    prompt_changes = _SYSTEM_PROMPT_USER_CHANGES.replace("{{current_html}}", current_html)
-    prompt_changes = prompt_changes.replace("{{resume_text}}", resume_text)
-    prompt_changes = prompt_changes.replace("{{website_plan}}", website_plan)
-    prompt_changes = prompt_changes.replace("{{user_request}}", user_request)
-
     messages = [
-        {"role": "system", "content": prompt_changes},
+        {"role": "system", "content": _SYSTEM_PROMPT_USER_CHANGES},
         {
             "role": "user",
-            "content": f"Please apply the following changes to my website: {user_request}",
+            "content": _USER_PROMPT_USER_CHANGES.substitute(
+                current_html=current_html,
+                resume_text=resume_text,
+                website_plan=website_plan,
+                user_request=user_request,
+            ),
         },
     ]
 
@@ -615,7 +1111,7 @@ def apply_user_changes_llm(
         status_callback("🤖 Calling LLM to apply changes...")
 
     try:
-        rsp = chat(model=model or _MODEL, messages=messages)
+        rsp = _chat_with_retry(messages, model)
         raw_output = rsp.message.content
         modified_html = _extract_html(raw_output)
 
@@ -660,29 +1156,34 @@ def summarize_html_changes_llm(old_html: str, new_html: str, model: str | None =
     def extract_key_info(html_content: str) -> dict:
         """Extract key information from HTML for comparison"""
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = BeautifulSoup(html_content, _BS4_PARSER)
             
-            # Extract text content by sections
+            # One traversal for both headings and <style> blocks
             sections = {}
-            for header in soup.find_all(['h1', 'h2', 'h3', 'h4']):
-                section_name = header.get_text().strip()
-                # Get content until next header of same or higher level
+            css_parts = []
+            for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'style']):
+                if tag.name == 'style':
+                    css_parts.append(tag.get_text())
+                    continue
+                section_name = tag.get_text().strip()
+                # Get content until next header; only the first 200 chars are kept
                 content = []
-                for sibling in header.find_next_siblings():
-                    if sibling.name in ['h1', 'h2', 'h3', 'h4']:
+                size = 0
+                for sibling in tag.find_next_siblings():
+                    if sibling.name in _HEADING_TAGS or size >= 200:
                         break
-                    if sibling.get_text().strip():
-                        content.append(sibling.get_text().strip())
+                    if text := sibling.get_text().strip():
+                        content.append(text)
+                        size += len(text) + 1
                 sections[section_name] = ' '.join(content)[:200]  # Limit length
-                
+
             # Extract styling info
-            style_tags = soup.find_all('style')
-            css_content = ' '.join([tag.get_text() for tag in style_tags])
+            css_content = ' '.join(css_parts)
             
             # Look for key CSS properties
-            colors = re.findall(r'color:\s*([^;]+)', css_content)
-            backgrounds = re.findall(r'background[^:]*:\s*([^;]+)', css_content)
-            fonts = re.findall(r'font-family:\s*([^;]+)', css_content)
+            colors = _RE_COLOR.findall(css_content)
+            backgrounds = _RE_BACKGROUND.findall(css_content)
+            fonts = _RE_FONT_FAMILY.findall(css_content)
             
             return {
                 'sections': sections,
@@ -749,7 +1250,7 @@ Keep it under 150 words and focus on the most impactful changes.
 
     try:
         messages = [{"role": "user", "content": analysis_prompt}]
-        response = chat(model=model or _MODEL, messages=messages)
+        response = _chat_with_retry(messages, model)
           # Extract content from LLM response
         summary = response.message.content.strip()
         
@@ -471,6 +471,7 @@ def trigger_website_generation():
 
     PLAN_PREFIX = "📝 **Website Plan:**\\\\n```\\\\n"
     PLAN_SUFFIX = "\\\\n```"
+    STATUS_ICONS = ("📄", "🧠", "📝", "⏳", "🤖", "⚠️", "🛠️", "❌", "✅", "💾", "🔍")
 
     if st.session_state.selected_mode == "AI Direct Build (Custom design & layout)":
         st.subheader("🎨 Custom AI Website Generation")
@@ -492,13 +493,20 @@ def trigger_website_generation():
                     status_ui.error(message)
                     st.session_state.process_log_entries.append(full_log_entry)
                 else:
-                    status_ui.write(full_log_entry)
-                    if not any(
-                        message.startswith(p)
-                        for p in ["📝", "✅", "📄", "🛠️", "🤖", "🔍"]
-                    ):
-                        status_ui.update(label=message)
-                    st.session_state.process_log_entries.append(full_log_entry)
+                    # a step can arrive as several status lines at once – show, label
+                    # and log them exactly as if they had come one by one
+                    steps = message.split("\n")
+                    if len(steps) == 1 or not all(s.startswith(STATUS_ICONS) for s in steps):
+                        steps = [message]
+                    entries = [f"{timestamp} - {step}" for step in steps]
+                    status_ui.write("  \n".join(entries))
+                    labels = [
+                        step for step in steps
+                        if not step.startswith(("📝", "✅", "📄", "🛠️", "🤖", "🔍"))
+                    ]
+                    if labels:
+                        status_ui.update(label=labels[-1])
+                    st.session_state.process_log_entries.extend(entries)
 
             try:
                 html_output = generate_html_llm(
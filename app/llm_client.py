@@ -8,18 +8,22 @@ the same interface for the rest of the application.
 
 from __future__ import annotations
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 from abc import ABC, abstractmethod
 
 try:
-    from ollama import chat as ollama_chat
+    from ollama import Client as OllamaHTTPClient
 except ImportError:
-    ollama_chat = None
+    OllamaHTTPClient = None
 
 try:
-    from openai import OpenAI
+    from openai import OpenAI, APIConnectionError
 except ImportError:
     OpenAI = None
+    APIConnectionError = ConnectionError
+
+# HTTP statuses that mean "busy, try again later" for both providers
+RETRY_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
 
 
 class LLMResponse:
@@ -44,19 +48,40 @@ class LLMClient(ABC):
         """Send a chat request to the LLM provider."""
         pass
 
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Yield the response text piece by piece (whole reply if not overridden)."""
+        yield self.chat(model, messages).message.content
+
 
 class OllamaClient(LLMClient):
     """Ollama client implementation."""
     
-    def __init__(self):
-        if ollama_chat is None:
+    def __init__(self, host: str | None = None):
+        if OllamaHTTPClient is None:
             raise ImportError("ollama package is required for OllamaClient")
+        
+        try:
+            from config import OLLAMA_BASE_URL, OLLAMA_KEEP_ALIVE, OLLAMA_MODEL_PARAMS
+            host = host or OLLAMA_BASE_URL
+            keep_alive, options = OLLAMA_KEEP_ALIVE, OLLAMA_MODEL_PARAMS
+        except ImportError:
+            host = host or os.getenv("OLLAMA_BASE_URL")
+            keep_alive, options = "30m", {"num_ctx": 16384}
+        
+        # One HTTP client for the process – the connection to the server stays open
+        self.client = OllamaHTTPClient(host=host)
+        self.params = {"keep_alive": keep_alive, "options": options}
     
     def chat(self, model: str, messages: List[Dict[str, str]]) -> LLMResponse:
         """Send a chat request to Ollama."""
-        response = ollama_chat(model=model, messages=messages)
+        response = self.client.chat(model=model, messages=messages, **self.params)
         return LLMResponse(response.message.content)
 
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Stream a chat response from Ollama."""
+        for chunk in self.client.chat(model=model, messages=messages, stream=True, **self.params):
+            yield chunk.message.content or ""
+
 
 class OpenAIClient(LLMClient):
     """OpenAI client implementation."""
@@ -66,14 +91,18 @@ class OpenAIClient(LLMClient):
             raise ImportError("openai package is required for OpenAIClient")
         
         # Use provided API key or get from environment
-        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            try:
+                from config import require_openai_key
+                api_key = require_openai_key()
+            except ImportError:
+                api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable or pass api_key parameter.")
         
         self.client = OpenAI(api_key=api_key)
     
-    def chat(self, model: str, messages: List[Dict[str, str]]) -> LLMResponse:
-        """Send a chat request to OpenAI."""
+    def _params(self, model: str) -> Dict[str, Any]:
         # Map devstral to a suitable OpenAI model for backwards compatibility
         if model == "devstral":
             model = "gpt-4o-mini"  # Use gpt-4o-mini as a good default for code generation
@@ -86,14 +115,28 @@ class OpenAIClient(LLMClient):
             temperature = 0.7
             max_tokens = 4096
         
+        return {"model": model, "temperature": temperature, "max_tokens": max_tokens}
+    
+    def chat(self, model: str, messages: List[Dict[str, str]]) -> LLMResponse:
+        """Send a chat request to OpenAI."""
         response = self.client.chat.completions.create(
-            model=model,
             messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens
+            **self._params(model)
         )
         
         return LLMResponse(response.choices[0].message.content)
+    
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """Stream a chat response from OpenAI."""
+        response = self.client.chat.completions.create(
+            messages=messages,
+            stream=True,
+            **self._params(model)
+        )
+        with response:  # closes the HTTP stream if the caller stops early
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
 
 
 def get_llm_client() -> LLMClient:
@@ -112,6 +155,14 @@ def get_llm_client() -> LLMClient:
         raise ValueError(f"Unsupported LLM provider: {provider}")
 
 
+def is_transient_error(exc: Exception) -> bool:
+    """True for connection drops, rate limits and overloaded-server responses."""
+    if isinstance(exc, (ConnectionError, TimeoutError, APIConnectionError)):
+        return True
+    # ollama.ResponseError and openai.APIStatusError both carry status_code
+    return getattr(exc, "status_code", None) in RETRY_STATUS_CODES
+
+
 # Create a global client instance
 _llm_client = None
 
@@ -127,3 +178,12 @@ def chat(model: str, messages: List[Dict[str, str]]) -> LLMResponse:
         _llm_client = get_llm_client()
     
     return _llm_client.chat(model, messages)
+
+
+def stream_chat(model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+    """Like chat(), but yields the reply text as it is generated."""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = get_llm_client()
+    
+    return _llm_client.stream(model, messages)
@@ -2,7 +2,7 @@
 LLM-based résumé parser.
 
 • Supports multiple LLM providers (Ollama with Devstral, OpenAI with GPT models)
-• Caches responses in .cache/<sha256>.json so the model is
+• Caches responses in .cache/<content hash>.json so the model is
   queried only once per unique resume text.
 • Runs clean_resume() to de-camel titles, format phone, etc.
 """
@@ -14,7 +14,7 @@ from llm_client import chat
 
 from schema_resume import RESUME_SCHEMA
 from cleaner import clean_resume
-from utils import _sha
+from utils import _cache_file
 
 # Model and cache configuration
 try:
@@ -48,7 +48,8 @@ def _extract_json(raw: str) -> dict:
 
 
 def parse_resume_llm(raw_text: str, model: str | None = None) -> dict:
-    cache_path = _CACHE_DIR / f"{_sha(raw_text)}.json"
+    # parsed résumés are still keyed on the raw text alone, so pre-BLAKE3 entries can hit
+    cache_path = _cache_file(_CACHE_DIR, ".json", raw_text, legacy=True)
 
     if cache_path.exists():
         return json.loads(cache_path.read_text())
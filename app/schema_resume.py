@@ -1,3 +1,5 @@
+from typing import Dict, List, TypedDict
+
 # canonical schema (empty lists – no placeholders)
 RESUME_SCHEMA = {
     "name": "",
@@ -9,3 +11,40 @@ RESUME_SCHEMA = {
     "skills": {"core": [], "languages": [], "tools": [], "soft": []},
     "projects": [],
 }
+
+
+# shapes produced by cleaner.clean_resume – plain dicts at runtime, so the
+# JSON cache, st.json and the Jinja template keep working unchanged
+class Job(TypedDict, total=False):
+    title: str
+    company: str
+    location: str
+    start: str
+    end: str
+    bullets: List[str]
+
+
+class Education(TypedDict, total=False):
+    degree: str
+    school: str
+    location: str
+    start: str
+    end: str
+    bullets: List[str]
+
+
+class Project(TypedDict):
+    title: str
+    url: str
+    bullets: List[str]
+
+
+class Resume(TypedDict, total=False):
+    name: str
+    headline: str
+    contact: Dict[str, str]
+    summary: str
+    experience: List[Job]
+    education: List[Education]
+    skills: Dict[str, List[str]]
+    projects: List[Project]
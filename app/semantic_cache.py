@@ -0,0 +1,90 @@
+"""
+Embedding lookup on top of the exact SHA-keyed HTML cache.
+
+• A résumé whose text only differs slightly from one already generated
+  (typo fix, reordered sentence) reuses that page instead of a new LLM run.
+• Vectors come from a local Ollama embedding model and are stored,
+  unit-normalised, in one float32 matrix (.npz) next to the cached pages.
+• A page is only reused for the same person: each entry records the
+  résumé's e-mail addresses, and they must match exactly.
+"""
+
+from __future__ import annotations
+import io
+import os
+import re
+import threading
+from pathlib import Path
+
+from utils import _atomic_write, _env_number
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import ollama
+except ImportError:
+    ollama = None
+
+_EMBED_MODEL = "nomic-embed-text"
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_THRESHOLD = 0.92  # cosine similarity needed to reuse a cached page (SEMANTIC_CACHE_THRESHOLD)
+_INDEX_LOCK = threading.Lock()  # batch threads append to the same index file
+
+
+def available() -> bool:
+    return np is not None and ollama is not None
+
+
+def identity(text: str) -> str:
+    """E-mail addresses of a résumé ("" when it has none to compare)."""
+    # phone numbers are left out – date ranges like "06/2019 - 05/2023" look just like them
+    return "|".join(sorted({m.lower() for m in _EMAIL_RE.findall(text)}))
+
+
+def embed(text: str):
+    """Unit-length embedding of `text`, or None if the model can't be reached."""
+    try:
+        rsp = ollama.embeddings(model=os.getenv("SEMANTIC_CACHE_MODEL", _EMBED_MODEL), prompt=text)
+    except Exception:
+        return None
+    vec = np.asarray(rsp["embedding"], dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else None
+
+
+def _load(index_path: Path):
+    if not index_path.exists():
+        return None, [], []
+    try:
+        with np.load(index_path) as data:
+            return data["vectors"], data["keys"].tolist(), data["ids"].tolist()
+    except Exception:  # unreadable or pre-identity index → start over
+        return None, [], []
+
+
+def nearest(vec, ident: str, index_path: Path) -> str | None:
+    """Cache key of the closest stored résumé of the same person, if it clears the threshold."""
+    vectors, keys, ids = _load(index_path)
+    if not ident or vectors is None or not keys or vectors.shape[1] != vec.shape[0]:
+        return None
+    scores = np.where(np.asarray(ids) == ident, vectors @ vec, -1.0)  # rows are unit length
+    best = int(scores.argmax())
+    threshold = _env_number("SEMANTIC_CACHE_THRESHOLD", _THRESHOLD)
+    return keys[best] if scores[best] >= threshold else None
+
+
+def add(vec, key: str, ident: str, index_path: Path) -> None:
+    if not ident:  # nothing to tell whose page it is → never offered to anyone else
+        return
+    with _INDEX_LOCK:
+        vectors, keys, ids = _load(index_path)
+        if vectors is None or vectors.shape[1] != vec.shape[0]:  # new or re-modelled index
+            vectors, keys, ids = vec[None, :], [key], [ident]
+        else:
+            vectors, keys, ids = np.vstack([vectors, vec]), keys + [key], ids + [ident]
+        buf = io.BytesIO()
+        np.savez(buf, vectors=vectors, keys=np.array(keys), ids=np.array(ids))
+        _atomic_write(index_path, buf.getvalue())
@@ -2,9 +2,72 @@
 Utility functions for the resume2site app.
 """
 
+from __future__ import annotations
 import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    import blake3  # SIMD hash, several times faster than SHA-256 on large inputs
+except ImportError:
+    blake3 = None
 
 
 def _sha(text: str) -> str:
     """Computes SHA256 hash of a string."""
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _cache_key(*parts: str) -> str:
+    """
+    Content key for the on-disk caches. Parts are hashed incrementally, so
+    callers don't build a concatenated copy. BLAKE3 keys carry a "b3"
+    prefix; without blake3 the key equals _sha("".join(parts)).
+    """
+    h = blake3.blake3() if blake3 is not None else hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+    return ("b3" if blake3 is not None else "") + h.hexdigest()
+
+
+def _cache_file(cache_dir: Path, suffix: str, *parts: str, legacy: bool = False) -> Path:
+    """Cache path for `parts`; `legacy` also reuses an entry written under the old SHA-256 key."""
+    path = cache_dir / f"{_cache_key(*parts)}{suffix}"
+    if legacy and blake3 is not None and not path.exists():
+        legacy = cache_dir / f"{_sha(''.join(parts))}{suffix}"
+        if legacy.exists():
+            return legacy
+    return path
+
+
+def _env_number(name: str, default, cast=float):
+    """Numeric env setting; a malformed value falls back to `default` with a warning."""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return cast(raw)
+    except ValueError:
+        logging.getLogger(__name__).warning("Ignoring %s=%r (not a number); using %s", name, raw, default)
+        return default
+
+
+def _atomic_write(path: Path, data: str | bytes) -> None:
+    """Write via a temp file + os.replace so readers never see a half-written cache entry."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates 0600 files; keep the replaced entry's mode, else the usual 0644
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise